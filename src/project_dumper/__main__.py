@@ -0,0 +1,6 @@
+from __future__ import annotations
+
+from project_dumper.cli import main
+
+if __name__ == "__main__":
+    main()
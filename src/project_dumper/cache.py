@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Optional
+
+from project_dumper.constants import CACHE_DIR_NAME
+
+# Bump whenever the stored format, or what gets stored (e.g. the binary
+# heuristic, decoding or numbering rules), changes. Mismatching entries are
+# ignored and overwritten.
+CACHE_SCHEMA_VERSION: int = 1
+
+
+def default_cache_dir(root: Path) -> Path:
+    """
+    Per-user cache location for the project at `root`, so nothing is
+    written into the project itself. Each root gets its own folder, so one
+    project's cache can be deleted on its own.
+    """
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    elif sys.platform == "darwin":
+        base = Path.home() / "Library" / "Caches"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    digest = hashlib.sha1(os.fsencode(root)).hexdigest()[:16]
+    return Path(base) / CACHE_DIR_NAME / digest
+
+
+class FileCache:
+    """
+    Persistent cache of rendered file bodies (the text as written to the
+    dump), keyed by absolute path and numbering mode and validated against
+    the file's (mtime_ns, size).
+
+    Each file gets its own entry, sharded by a hash of its key, and entries
+    are only read when that file comes up. Nothing is loaded up front, so
+    memory stays bounded no matter how large the project is. An entry is
+    one line of JSON metadata followed by the raw UTF-8 body, so a hit
+    costs about as much as reading the file itself.
+
+    The metadata is JSON (not pickle) so that dumping an untrusted project
+    can't execute code from a planted cache file.
+    """
+
+    def __init__(self, cache_dir: Path, numbered: bool) -> None:
+        self.cache_dir = cache_dir
+        self._dir = os.fspath(cache_dir)
+        self._mode = "numbered" if numbered else "plain"
+        self._created = False
+
+    def _entry_path(self, path: str) -> str:
+        digest = hashlib.sha1(os.fsencode(f"{self._mode}\0{path}")).hexdigest()
+        return os.path.join(self._dir, digest[:2], digest[2:])
+
+    def lookup(self, path: str, mtime_ns: int, size: int) -> Optional[str]:
+        """
+        Return the cached body for `path`, or None if there is no entry or
+        it is out of date. Safe to call from several threads.
+        """
+        try:
+            with open(self._entry_path(path), "rb") as f:
+                meta = json.loads(f.readline())
+                if (
+                    not isinstance(meta, dict)
+                    or meta.get("schema") != CACHE_SCHEMA_VERSION
+                    or meta.get("path") != path
+                    or type(meta.get("mtime_ns")) is not int
+                    or type(meta.get("size")) is not int
+                    or meta["mtime_ns"] != mtime_ns
+                    or meta["size"] != size
+                ):
+                    return None
+                return f.read().decode("utf-8")
+        except (OSError, ValueError):
+            return None
+
+    def store(self, path: str, mtime_ns: int, size: int, body: str) -> None:
+        """
+        Write the entry for `path`. Failures are ignored; the cache is
+        only an optimization.
+        """
+        target = self._entry_path(path)
+        tmp = f"{target}.{os.getpid()}.tmp"
+        meta = {
+            "schema": CACHE_SCHEMA_VERSION,
+            "path": path,
+            "mtime_ns": mtime_ns,
+            "size": size,
+        }
+        try:
+            if not self._created:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                # Keep the cache out of git if --cache-dir points into a repo.
+                gitignore = self.cache_dir / ".gitignore"
+                if not gitignore.exists():
+                    gitignore.write_text("*\n", encoding="utf-8")
+                self._created = True
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(tmp, "wb") as f:
+                # json.dumps escapes newlines, so the metadata is one line.
+                f.write(json.dumps(meta).encode("ascii") + b"\n")
+                f.write(body.encode("utf-8"))
+            os.replace(tmp, target)
+        except OSError:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
@@ -2,15 +2,28 @@ from __future__ import annotations
 
 import argparse
 import datetime as dt
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import List, Set
+from typing import FrozenSet, Iterable, Iterator, List, Tuple
 
 from project_dumper.constants import (
     DEFAULT_EXCLUDE_DIRS,
     DEFAULT_EXCLUDE_EXTS,
     DEFAULT_MAX_BYTES,
+    PARALLEL_NUMBERING_MIN_BYTES,
+)
+from project_dumper.cache import FileCache, default_cache_dir
+from project_dumper.files import (
+    Candidate,
+    find_candidates,
+    iter_files,
+    lookahead,
+    render_numbered,
 )
-from project_dumper.files import iter_files, read_text_file, add_line_numbers
 from project_dumper.header import format_header
 from project_dumper.tree import build_dir_tree
 from project_dumper.gitignore import load_gitignore
@@ -78,9 +91,74 @@ def parse_args() -> argparse.Namespace:
         help="Ignores .gitignore (default: uses .gitignore if present"
 
     )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help=(
+            "Cache each file's rendered contents so unchanged files are not re-read "
+            "or re-numbered on the next run (mainly pays off with --with-line-numbers)."
+        ),
+    )
+    parser.add_argument(
+        "--cache-dir",
+        default=None,
+        metavar="DIR",
+        help=(
+            "Where to keep the cache; implies --cache "
+            "(default: a per-project folder in the user cache directory)."
+        ),
+    )
     return parser.parse_args()
 
 
+def _render(
+    files: Iterable[Tuple[Candidate, str, bool]],
+    with_line_numbers: bool,
+    parallel: bool,
+) -> Iterator[Tuple[Candidate, str, bool]]:
+    """
+    Map `(candidate, text, cached)` to `(candidate, body, cached)` in the
+    same order. Cached texts are bodies already and are passed through.
+    """
+    if not with_line_numbers:
+        yield from files
+    elif not parallel:
+        for candidate, text, cached in files:
+            yield candidate, text if cached else render_numbered(text), cached
+    else:
+        workers = os.cpu_count() or 1
+        # `files` is fed by iter_files' loader threads, and forking a
+        # multi-threaded process can deadlock the child, so never fork.
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            # Submit lazily, a bounded window ahead, so the whole project
+            # isn't loaded up front the way executor.map would.
+            submitted = (
+                (candidate, text if cached else executor.submit(render_numbered, text), cached)
+                for candidate, text, cached in files
+            )
+            for candidate, body, cached in lookahead(submitted, 2 * workers):
+                yield candidate, body if cached else body.result(), cached
+
+
+def iter_bodies(
+    files: Iterable[Tuple[Candidate, str, bool]],
+    with_line_numbers: bool,
+    parallel: bool,
+    cache: FileCache | None = None,
+) -> Iterator[Tuple[str, str]]:
+    """
+    Yield `(rel, body)` for each file from `iter_files`, in the same order,
+    where the body is the text as it should be written. Freshly rendered
+    bodies are stored in `cache`.
+    """
+    for (path, rel, st), body, cached in _render(files, with_line_numbers, parallel):
+        if cache is not None and not cached:
+            cache.store(path, st.st_mtime_ns, st.st_size, body)
+        yield rel, body
+
+
 def main() -> None:
     args = parse_args()
 
@@ -100,23 +178,31 @@ def main() -> None:
     else:
         output = Path(args.output)
 
-    exclude_dirs: Set[str] = set(DEFAULT_EXCLUDE_DIRS) | set(args.exclude_dir)
-    exclude_exts: Set[str] = set(DEFAULT_EXCLUDE_EXTS) | {e.lower() for e in args.exclude_ext}
-    include_exts: Set[str] | None = (
-        {e.lower() for e in args.include_ext} if args.include_ext is not None else None
+    # Frozen once here; these are only ever used for membership tests.
+    exclude_dirs: FrozenSet[str] = frozenset(DEFAULT_EXCLUDE_DIRS).union(args.exclude_dir)
+    exclude_exts: FrozenSet[str] = frozenset(DEFAULT_EXCLUDE_EXTS).union(
+        e.lower() for e in args.exclude_ext
+    )
+    include_exts: FrozenSet[str] | None = (
+        frozenset(e.lower() for e in args.include_ext) if args.include_ext is not None else None
     )
 
-    files = sorted(
-        iter_files(
+    cache = None
+    if args.cache or args.cache_dir:
+        cache_dir = Path(args.cache_dir) if args.cache_dir else default_cache_dir(root)
+        cache = FileCache(cache_dir, numbered=args.with_line_numbers)
+
+    try:
+        candidates = find_candidates(
             root,
             exclude_dirs,
             exclude_exts,
             include_exts,
             args.max_bytes,
             gitignore_spec=gitignore_spec,
-        ),
-        key=lambda p: str(p.relative_to(root)),
-    )
+        )
+    except OSError as e:
+        raise SystemExit(f"Error scanning project tree {root}: {e}")
 
     header = format_header(root, include_exts, exclude_dirs, exclude_exts, gitignore_used=False)
 
@@ -126,40 +212,63 @@ def main() -> None:
         tree_str += build_dir_tree(root, exclude_dirs)
         tree_str += "\n\n" + "=" * 80 + "\n\n"
 
-    result_lines: List[str] = []
-    result_lines.append(header)
-    if tree_str:
-        result_lines.append(tree_str)
-
-    # Files section summary
-    result_lines.append("FILES INCLUDED")
-    result_lines.append("-" * 80)
-    for f in files:
-        rel = f.relative_to(root)
-        result_lines.append(str(rel))
-    result_lines.append("")
-    result_lines.append("=" * 80)
-    result_lines.append("")
-
-    # Now dump each file with its own header + contents
-    for f in files:
-        rel = f.relative_to(root)
-        result_lines.append(f"==== FILE: {rel} ====")
-        result_lines.append("")
-        content = read_text_file(f)
-        if args.with_line_numbers:
-            content = add_line_numbers(content)
-        result_lines.append(content)
-        result_lines.append("")  # blank line between files
-
-    text = "\n".join(result_lines)
+    # (relative POSIX path, body) pairs in output order, loaded a bounded
+    # window at a time.
+    bodies = iter_bodies(
+        iter_files(candidates, args.max_bytes, cache=cache),
+        args.with_line_numbers,
+        parallel=(
+            (os.cpu_count() or 1) > 1
+            and sum(st.st_size for _, _, st in candidates) >= PARALLEL_NUMBERING_MIN_BYTES
+        ),
+        cache=cache,
+    )
 
+    included: List[str] = []
     try:
-        output.write_text(text, encoding="utf-8")
+        # Which candidates are text is only known once they're loaded, but the
+        # FILES INCLUDED list comes first in the dump. File sections are
+        # therefore spooled to a temp file next to the output as they stream
+        # in, and copied over after the list, keeping memory bounded.
+        with tempfile.TemporaryFile(
+            "w+",
+            buffering=1 << 20,
+            encoding="utf-8",
+            newline="",
+            dir=output.resolve().parent,
+        ) as spool:
+            # The 1 MiB buffer coalesces the small per-file writes below into
+            # large write() syscalls, so there's no need to pre-join sections.
+            for rel, body in bodies:
+                included.append(rel)
+                # Blank line before each file, matching the layout of the
+                # original "\n".join of all output lines.
+                spool.write(f"\n==== FILE: {rel} ====\n\n")
+                spool.write(body)
+                spool.write("\n")
+
+            with output.open("w", encoding="utf-8", buffering=1 << 20) as out:
+                out.write(header)
+                out.write("\n")
+                if tree_str:
+                    out.write(tree_str)
+                    out.write("\n")
+
+                # Files section summary
+                out.write("FILES INCLUDED\n")
+                out.write("-" * 80 + "\n")
+                # One write for the whole list instead of one per file.
+                out.write("".join([f"{rel}\n" for rel in included]))
+                out.write("\n")
+                out.write("=" * 80 + "\n")
+
+                # Now each file with its own header + contents
+                spool.seek(0)
+                shutil.copyfileobj(spool, out, 1 << 20)
     except OSError as e:
         raise SystemExit(f"Error writing output file {output}: {e}")
 
-    print(f"Wrote dump for {len(files)} files to {output}")
+    print(f"Wrote dump for {len(included)} files to {output}")
 
 
 if __name__ == "__main__":
@@ -59,3 +59,11 @@ DEFAULT_MAX_BYTES: int = 2_000_000
 # Number of bytes sampled when detecting binary files.
 BINARY_DETECTION_SAMPLE_SIZE: int = 8_000
 
+
+# Line numbering is pure-Python string work (GIL-bound), so on multi-CPU
+# hosts it moves to a process pool once there is enough text (in bytes,
+# summed over the candidate files) to pay for pool start-up and IPC.
+PARALLEL_NUMBERING_MIN_BYTES: int = 16_000_000
+
+# Folder under the per-user cache directory that holds per-project caches.
+CACHE_DIR_NAME: str = "project-dumper"
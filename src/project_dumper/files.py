@@ -1,93 +1,312 @@
 from __future__ import annotations
 
+import errno
 import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Iterable, List, Set
-from project_dumper.gitignore import matches_gitignore
+from typing import AbstractSet, Deque, Iterable, Iterator, List, Sequence, Tuple, TypeVar
+from project_dumper.cache import FileCache
+from project_dumper.gitignore import matches_gitignore_rel
 
 from project_dumper.constants import BINARY_DETECTION_SAMPLE_SIZE
 
+# O_BINARY only exists (and only matters) on Windows.
+_O_RDONLY = os.O_RDONLY | getattr(os, "O_BINARY", 0)
 
-def is_probably_binary(path: Path, sample_size: int = BINARY_DETECTION_SAMPLE_SIZE) -> bool:
+# Where supported (POSIX), directories are listed through an open fd so that
+# DirEntry.stat() is relative to it (fstatat) instead of re-resolving the
+# full path from the root for every file.
+_SCANDIR_FD = os.scandir in os.supports_fd
+_O_DIRECTORY = os.O_RDONLY | getattr(os, "O_DIRECTORY", 0) | getattr(os, "O_NOFOLLOW", 0)
+
+# (absolute path, root-relative POSIX path, stat result) for a file that
+# passed every filter that doesn't need to open it.
+Candidate = Tuple[str, str, os.stat_result]
+
+T = TypeVar("T")
+
+
+def _has_nul(data: bytes, limit: int) -> bool:
     """
-    Heuristic: if the sampled bytes contain NUL, treat as binary.
+    True if `data[:limit]` contains a NUL byte.
+
+    `bytes.find` with an end bound scans in place (memchr) instead of
+    copying the prefix out first.
     """
-    try:
-        with path.open("rb") as f:
-            chunk = f.read(sample_size)
-        if b"\x00" in chunk:
-            return True
-        return False
-    except OSError:
-        # If we can't read it, treat it as binary/unwanted
-        return True
+    return data.find(b"\x00", 0, limit) != -1
 
 
-def iter_files(
+def _default_workers() -> int:
+    # Sniffing/loading files is I/O-bound, so oversubscribe the CPUs.
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+def lookahead(items: Iterable[T], size: int) -> Iterator[T]:
+    """
+    Yield `items` in order while keeping up to `size` of them pulled ahead.
+
+    With a lazy iterable that submits work to an executor, this bounds the
+    number of outstanding tasks (and of results held in memory) to `size`.
+    """
+    pending: Deque[T] = deque()
+    for item in items:
+        pending.append(item)
+        if len(pending) > size:
+            yield pending.popleft()
+    while pending:
+        yield pending.popleft()
+
+
+def _scan(
+    root: str,
+    exclude_dirs: AbstractSet[str],
+    gitignore_spec = None,
+) -> Iterator[Tuple[os.DirEntry[str], str, str]]:
+    """
+    Yield `(entry, path, rel)` for regular files under `root`, where `rel`
+    is the root-relative POSIX path.
+
+    Uses `os.scandir` so the file type comes from the directory read
+    instead of an extra stat per entry. Symlinked directories are not
+    followed (same as `os.walk`), and gitignored directories are pruned
+    so nothing below them is listed or matched.
+
+    Iterative (explicit stack, like `build_dir_tree`) so deep trees don't
+    hit the recursion limit, and each directory is listed and closed
+    before any directory below it is opened.
+    """
+    # (path, slash-terminated relative path or "" for the root) of
+    # directories still to list.
+    stack: List[Tuple[str, str]] = [(root, "")]
+    while stack:
+        dirpath, rel_dir = stack.pop()
+        subdirs: List[Tuple[str, str]] = []
+        fd: int | None = None
+        try:
+            if _SCANDIR_FD:
+                fd = os.open(dirpath, _O_DIRECTORY)
+            it = os.scandir(dirpath if fd is None else fd)
+        except OSError as e:
+            if fd is not None:
+                os.close(fd)
+            # Running out of descriptors says nothing about this directory;
+            # skipping it would silently drop its whole subtree.
+            if e.errno in (errno.EMFILE, errno.ENFILE):
+                raise
+            continue
+        # DirEntry.stat() goes through `fd`, so it stays open until every
+        # entry has been handled.
+        try:
+            with it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir()
+                    except OSError:
+                        continue
+                    # In fd mode entry.path is just the name, so build it ourselves.
+                    path = os.path.join(dirpath, entry.name)
+                    rel = rel_dir + entry.name
+                    if is_dir:
+                        if entry.is_symlink() or entry.name in exclude_dirs:
+                            continue
+                        rel += "/"
+                        if not matches_gitignore_rel(gitignore_spec, rel):
+                            subdirs.append((path, rel))
+                    elif entry.is_file():
+                        yield entry, path, rel
+        finally:
+            if fd is not None:
+                os.close(fd)
+        stack.extend(subdirs)
+
+
+def _iter_candidates(
     root: Path,
-    exclude_dirs: Set[str],
-    exclude_exts: Set[str],
-    include_exts: Set[str] | None,
+    exclude_dirs: AbstractSet[str],
+    exclude_exts: AbstractSet[str],
+    include_exts: AbstractSet[str] | None,
     max_bytes: int,
     gitignore_spec = None,
-) -> Iterable[Path]:
+) -> Iterator[Candidate]:
     """
-    Walk the project tree and yield files that match filtering rules.
+    Yield `(path, rel, stat)` for files that pass every filter
+    that doesn't need to open the file (name, extension, size, gitignore),
+    cheapest first. Binary detection is left to `iter_files`.
     """
-    root = root.resolve()
-    for dirpath, dirnames, filenames in os.walk(root):
-        # Filter directories in-place so os.walk doesn't descend into them
-        dirnames[:] = [
-            d for d in dirnames
-            if not matches_gitignore(gitignore_spec, Path(dirpath) / d, root)
-            and d not in exclude_dirs
-        ]
-        for name in filenames:
-            path = Path(dirpath) / name
-            ext = path.suffix.lower()
-
-            if include_exts is not None and ext not in include_exts:
-                continue
+    # Fold the whitelist and blacklist into a single set, so each file
+    # costs one membership test.
+    allowed_exts = frozenset(include_exts) - exclude_exts if include_exts is not None else None
 
-            if ext in exclude_exts:
-                continue
+    for entry, path, rel in _scan(str(root), exclude_dirs, gitignore_spec):
+        # Same rule as Path.suffix, without building a Path.
+        name = entry.name
+        if name == ".gitignore":
+            continue
 
-            try:
-                size = path.stat().st_size
-            except OSError:
-                continue
+        dot = name.rfind(".")
+        ext = name[dot:].lower() if 0 < dot < len(name) - 1 else ""
 
-            if size > max_bytes:
+        if allowed_exts is not None:
+            if ext not in allowed_exts:
                 continue
+        elif ext in exclude_exts:
+            continue
 
-            if is_probably_binary(path):
-                continue
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
 
-            if matches_gitignore(gitignore_spec, path, root):
-                continue
+        if st.st_size > max_bytes:
+            continue
 
-            if path.name == ".gitignore":
-                continue
+        if matches_gitignore_rel(gitignore_spec, rel):
+            continue
+
+        yield path, rel, st
 
-            yield path
 
+def find_candidates(
+    root: Path,
+    exclude_dirs: AbstractSet[str],
+    exclude_exts: AbstractSet[str],
+    include_exts: AbstractSet[str] | None,
+    max_bytes: int,
+    gitignore_spec = None,
+) -> List[Candidate]:
+    """
+    Walk the project tree and return the files that pass every filter
+    short of binary detection, sorted by relative path (output order).
+    Only metadata is collected here; nothing is opened.
+    """
+    root = root.resolve()
+    return sorted(
+        _iter_candidates(
+            root, exclude_dirs, exclude_exts, include_exts, max_bytes, gitignore_spec
+        ),
+        key=itemgetter(1),
+    )
+
+
+def iter_files(
+    candidates: Sequence[Candidate],
+    max_bytes: int,
+    cache: FileCache | None = None,
+) -> Iterator[Tuple[Candidate, str, bool]]:
+    """
+    Load `candidates` and yield `(candidate, text, cached)` for the ones
+    that are text, in the same order.
+
+    `probe_and_load` (one open + read per file) runs on a thread pool with
+    at most two loads per worker outstanding, so only a bounded window of
+    file texts is in memory at a time. With a `cache`, files whose mtime
+    and size are unchanged are served from it and not opened at all; for
+    those `cached` is True and `text` is the body exactly as it was
+    written to the dump, so it needs no further rendering.
+    """
+    workers = _default_workers()
+
+    def load(candidate: Candidate) -> Tuple[str | None, bool]:
+        path, _, st = candidate
+        if cache is not None:
+            body = cache.lookup(path, st.st_mtime_ns, st.st_size)
+            if body is not None:
+                return body, True
+        return probe_and_load(path, max_bytes), False
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+
+        def submit(batch: List[Candidate]) -> List[Tuple[Candidate, Future[Tuple[str | None, bool]]]]:
+            # Issue the batch's reads in (device, inode) order, which tends to
+            # follow on-disk layout better than path order; results are
+            # paired back up by index, so the caller still sees path order.
+            order = sorted(range(len(batch)), key=lambda i: (batch[i][2].st_dev, batch[i][2].st_ino))
+            futures = {i: executor.submit(load, batch[i]) for i in order}
+            return [(candidate, futures[i]) for i, candidate in enumerate(batch)]
 
-def read_text_file(path: Path) -> str:
-    """Read a text file with utf-8 + replacement fallback."""
+        # One batch is submitted while the previous one is consumed, so at
+        # most two loads per worker are outstanding.
+        remaining = iter(candidates)
+        batches = iter(lambda: list(islice(remaining, workers)), [])
+        for batch in lookahead(map(submit, batches), 1):
+            for candidate, future in batch:
+                text, cached = future.result()
+                if text is not None:
+                    yield candidate, text, cached
+
+
+def _read_fd(fd: int, size: int) -> bytes:
+    """Read a whole file of (fstat) `size` bytes from `fd`."""
+    data = os.read(fd, size)
+    while len(data) < size:
+        more = os.read(fd, size - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def _decode(data: bytes) -> str:
+    """Decode utf-8 with replacement and normalize newlines like text mode does."""
+    text = data.decode("utf-8", "replace")
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+def probe_and_load(
+    path: str | Path,
+    max_bytes: int,
+    sample_size: int = BINARY_DETECTION_SAMPLE_SIZE,
+) -> str | None:
+    """
+    Open `path` once, apply the binary heuristic to its first `sample_size`
+    bytes and return the decoded text. Returns None for binary, oversized
+    or unreadable files.
+    """
     try:
-        return path.read_text(encoding="utf-8", errors="replace")
+        fd = os.open(path, _O_RDONLY)
+        try:
+            size = os.fstat(fd).st_size
+            if size > max_bytes:
+                return None
+            # Sniff the head first so a large binary file costs one small read.
+            data = _read_fd(fd, min(size, sample_size))
+            if _has_nul(data, sample_size):
+                return None
+            if size > len(data):
+                data += _read_fd(fd, size - len(data))
+            return _decode(data)
+        finally:
+            os.close(fd)
     except OSError:
-        return f"<<ERROR: could not read file {path}>>"
+        return None
 
 
-def add_line_numbers(text: str, start: int = 1) -> str:
+def _split_lines(text: str) -> List[str]:
     """
-    Prefix each line with a line number.
+    Split on "\n" only (newlines are already normalized when files are
+    read); a trailing newline does not start an extra line.
     """
-    lines = text.splitlines()
-    width = len(str(start + len(lines) - 1))
-    numbered: List[str] = [
-        f"{str(i).rjust(width)} | {line}" for i, line in enumerate(lines, start)
-    ]
-    return "\n".join(numbered)
+    if not text:
+        return []
+    lines = text.split("\n")
+    if not lines[-1]:
+        lines.pop()
+    return lines
+
 
+def render_numbered(text: str, start: int = 1) -> str:
+    """
+    Prefix each line with a line number, joined with no trailing newline
+    (same as the unnumbered text would have after `splitlines`).
+    Module-level so it can be sent to a process pool.
+    """
+    lines = _split_lines(text)
+    width = len(str(start + len(lines) - 1))
+    # str(i).rjust() in a list comprehension measured faster than a nested
+    # format spec ({i:>{width}}) or a generator fed to join.
+    return "\n".join([f"{str(i).rjust(width)} | {line}" for i, line in enumerate(lines, start)])
@@ -24,13 +24,14 @@ def load_gitignore(root: Path) -> Optional[pathspec.PathSpec]:
     return pathspec.PathSpec.from_lines("gitwildmatch", lines)
 
 
-def matches_gitignore(spec: Optional[pathspec.PathSpec], path: Path, root: Path) -> bool:
+def matches_gitignore_rel(spec: Optional[pathspec.PathSpec], rel: str) -> bool:
     """
-    Returns True if `path` should be ignored per gitignore.
+    Returns True if the root-relative POSIX path `rel` should be ignored
+    per gitignore. Directories should be passed with a trailing slash so that
+    directory-only patterns (e.g. `build/`) apply to them.
     """
     if spec is None:
         return False
 
-    rel = str(path.relative_to(root))
     return spec.match_file(rel)
 
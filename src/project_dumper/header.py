@@ -2,14 +2,14 @@ from __future__ import annotations
 
 import datetime as dt
 from pathlib import Path
-from typing import Set
+from typing import AbstractSet
 
 
 def format_header(
     root: Path,
-    include_exts: Set[str] | None,
-    exclude_dirs: Set[str],
-    exclude_exts: Set[str],
+    include_exts: AbstractSet[str] | None,
+    exclude_dirs: AbstractSet[str],
+    exclude_exts: AbstractSet[str],
     gitignore_used: bool,
 ) -> str:
     """
@@ -1,36 +1,69 @@
 from __future__ import annotations
 
+import io
+import os
 from pathlib import Path
-from typing import List, Set
+from typing import AbstractSet, List, Optional, Tuple
 
+# Connectors and the prefix segments they imply for the next level down.
+_TEE = "├── "
+_ELBOW = "└── "
+_PIPE = "│   "
+_BLANK = "    "
 
-def build_dir_tree(root: Path, exclude_dirs: Set[str]) -> str:
+
+def build_dir_tree(root: Path, exclude_dirs: AbstractSet[str]) -> str:
     """
     Build a simple ASCII tree of directories and files under `root`,
     skipping any directory whose name is in `exclude_dirs`.
     """
-    lines: List[str] = []
-
     root = root.resolve()
     root_name = root.name or str(root)
 
-    lines.append(root_name)
-
-    def walk(dir_path: Path, prefix: str = "") -> None:
-        entries = sorted(
-            [p for p in dir_path.iterdir()],
-            key=lambda p: (p.is_file(), p.name.lower()),
-        )
-        total = len(entries)
-        for idx, entry in enumerate(entries):
-            is_last = idx == total - 1
-            connector = "└── " if is_last else "├── "
-            line = f"{prefix}{connector}{entry.name}"
-            lines.append(line)
-            if entry.is_dir() and entry.name not in exclude_dirs:
-                new_prefix = prefix + ("    " if is_last else "│   ")
-                walk(entry, new_prefix)
-
-    walk(root)
-    return "\n".join(lines)
+    out = io.StringIO()
+    out.write(root_name)
+
+    # (prefix, connector, name, directory to expand next or None)
+    Node = Tuple[str, str, str, Optional[str]]
+
+    def children(dir_path: str, prefix: str) -> List[Node]:
+        # Decorate once with the DirEntry type info (cached from the directory
+        # read) so sorting and the expand check share a single is_dir() call.
+        # Unreadable directories are shown without children.
+        entries: List[Tuple[bool, str, str, str]] = []
+        try:
+            with os.scandir(dir_path) as it:
+                for entry in it:
+                    try:
+                        is_dir = entry.is_dir(follow_symlinks=False)
+                    except OSError:
+                        is_dir = False
+                    entries.append((not is_dir, entry.name.lower(), entry.name, entry.path))
+        except OSError:
+            return []
+        entries.sort()
+
+        last = len(entries) - 1
+        nodes: List[Node] = []
+        for idx, (is_file, _, name, path) in enumerate(entries):
+            expand = not is_file and name not in exclude_dirs
+            nodes.append((
+                prefix,
+                _ELBOW if idx == last else _TEE,
+                name,
+                path if expand else None,
+            ))
+        return nodes
+
+    # Explicit stack instead of recursion; children are pushed in reverse so
+    # they pop in sorted (depth-first) order. Each line is written straight
+    # to the buffer, newline first, so no list of lines or final join.
+    stack = children(str(root), "")[::-1]
+    while stack:
+        prefix, connector, name, dir_path = stack.pop()
+        out.write(f"\n{prefix}{connector}{name}")
+        if dir_path is not None:
+            child_prefix = prefix + (_BLANK if connector == _ELBOW else _PIPE)
+            stack.extend(reversed(children(dir_path, child_prefix)))
 
+    return out.getvalue()